@@ -0,0 +1,38 @@
+"""Создание сессии API Кинопоиска с заголовками и постоянным HTTP-кэшем."""
+import os
+
+import requests
+from dotenv import load_dotenv
+
+from http_cache import CACHE_MAX_BYTES, CACHE_PATH, CachingAdapter, ResponseCache, TimeoutAdapter
+
+load_dotenv()
+
+
+API_KEY = os.getenv('KINOPOISK_API_KEY')
+API_TIMEOUT = float(os.getenv('API_TIMEOUT', '10'))
+
+HTTP_CACHE = os.getenv('HTTP_CACHE', '1') != '0'
+HTTP_CACHE_PATH = os.getenv('HTTP_CACHE_PATH', CACHE_PATH)
+HTTP_CACHE_MAX_BYTES = int(os.getenv('HTTP_CACHE_MAX_BYTES', str(CACHE_MAX_BYTES)))
+HTTP_CACHE_TTL = float(os.getenv('HTTP_CACHE_TTL', '0'))
+
+
+def create_api_client(cache: bool = HTTP_CACHE, timeout: float = API_TIMEOUT) -> requests.Session:
+    """Создает сессию API с заголовками, тайм-аутом запросов и, если cache включен, с HTTP-кэшем."""
+    session = requests.Session()
+    session.headers.update({
+        "X-API-KEY": API_KEY,
+        "accept": "application/json"
+    })
+
+    session.mount("http://", TimeoutAdapter(timeout))
+    if cache:
+        session.mount("https://", CachingAdapter(
+            ResponseCache(HTTP_CACHE_PATH, HTTP_CACHE_MAX_BYTES),
+            default_ttl=HTTP_CACHE_TTL,
+            timeout=timeout
+        ))
+    else:
+        session.mount("https://", TimeoutAdapter(timeout))
+    return session
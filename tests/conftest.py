@@ -0,0 +1,46 @@
+"""Общие фикстуры для тестов Кинопоиска."""
+from collections import Counter
+from typing import Generator, Any
+
+import pytest
+import requests
+
+from api_session import create_api_client
+from http_cache import CachingAdapter, format_stats
+
+
+# Счетчики кэша текущего процесса; при pytest-xdist контроллер суммирует в них счетчики воркеров
+_cache_stats: Counter = Counter()
+
+
+@pytest.fixture(scope='session')
+def api_client() -> Generator[requests.Session, Any, None]:
+    """Фикстура для API клиента с правильными заголовками."""
+    session = create_api_client()
+
+    yield session
+
+    adapter = session.get_adapter("https://")
+    if isinstance(adapter, CachingAdapter):
+        _cache_stats.update(adapter.stats)
+    session.close()
+
+
+def pytest_sessionfinish(session: pytest.Session) -> None:
+    """Передает счетчики кэша воркера pytest-xdist контроллеру."""
+    workeroutput = getattr(session.config, "workeroutput", None)
+    if workeroutput is not None:
+        workeroutput["http_cache_stats"] = dict(_cache_stats)
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_testnodedown(node: Any, error: Any) -> None:
+    """Суммирует на контроллере pytest-xdist счетчики кэша завершившегося воркера."""
+    _cache_stats.update(getattr(node, "workeroutput", {}).get("http_cache_stats", {}))
+
+
+def pytest_terminal_summary(terminalreporter: Any) -> None:
+    """Выводит статистику HTTP-кэша в итог тестовой сессии."""
+    if sum(_cache_stats.values()):
+        terminalreporter.write_line(format_stats(dict(_cache_stats)))
+
@@ -0,0 +1,296 @@
+"""Постоянный HTTP-кэш ответов API с условными запросами и вытеснением по LRU."""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+
+CACHE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), ".http_cache", "responses.sqlite")
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# Заголовки, от которых зависит содержимое ответа, входят в ключ кэша
+KEY_HEADERS = ("X-API-KEY", "accept")
+
+# Заголовки, описывающие передачу тела по сети: не сохраняются и не обновляются из ответа 304
+BODY_HEADERS = ("content-encoding", "transfer-encoding", "content-length")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    headers TEXT NOT NULL,
+    body BLOB NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    expires_at REAL NOT NULL,
+    size INTEGER NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access);
+"""
+
+
+def _cache_control(headers: Any) -> Dict[str, Optional[str]]:
+    directives: Dict[str, Optional[str]] = {}
+    for part in headers.get("Cache-Control", "").split(","):
+        name, _, value = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = value.strip('"') or None
+    return directives
+
+
+def freshness_lifetime(headers: Any, default_ttl: float = 0.0) -> float:
+    """Возвращает срок свежести ответа в секундах по Cache-Control и Expires."""
+    directives = _cache_control(headers)
+    if "no-cache" in directives:
+        return 0.0
+    for name in ("s-maxage", "max-age"):
+        try:
+            return max(float(directives[name] or 0), 0.0)
+        except (KeyError, ValueError):
+            continue
+    if headers.get("Expires"):
+        try:
+            expires = parsedate_to_datetime(headers["Expires"]).timestamp()
+            return max(expires - time.time(), 0.0)
+        except (TypeError, ValueError):
+            return 0.0
+    return default_ttl
+
+
+def format_stats(stats: Dict[str, int]) -> str:
+    """Форматирует счетчики кэша в строку с долями попаданий, промахов и перепроверок."""
+    total = sum(stats.values())
+    if not total:
+        return "HTTP cache: no requests"
+    return "HTTP cache: " + ", ".join(
+        f"{name} {count} ({count / total:.0%})" for name, count in stats.items()
+    )
+
+
+class ResponseCache:
+    """Хранилище ответов в SQLite в режиме WAL, общее для потоков и параллельных процессов."""
+
+    def __init__(self, path: str = CACHE_PATH, max_bytes: int = CACHE_MAX_BYTES) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connection() as connection:
+            connection.executescript(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Возвращает запись кэша и отмечает обращение к ней для LRU."""
+        connection = self._connection()
+        row = connection.execute(
+            "SELECT url, status, headers, body, etag, last_modified, expires_at "
+            "FROM responses WHERE key = ?",
+            (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        connection.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+        url, status, headers, body, etag, last_modified, expires_at = row
+        return {
+            "url": url,
+            "status": status,
+            "headers": json.loads(headers),
+            "body": body,
+            "etag": etag,
+            "last_modified": last_modified,
+            "expires_at": expires_at,
+        }
+
+    def put(self, key: str, response: requests.Response, expires_at: float) -> None:
+        """Сохраняет ответ и вытесняет давно не использованные записи сверх лимита размера."""
+        body = response.content
+        headers = {name: value for name, value in response.headers.items()
+                   if name.lower() not in BODY_HEADERS}
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, url, status, headers, body, etag, last_modified, expires_at, size, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, response.url, response.status_code, json.dumps(headers), body,
+                 response.headers.get("ETag"), response.headers.get("Last-Modified"),
+                 expires_at, len(body), time.time())
+            )
+            self._evict(connection)
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def touch(self, key: str, expires_at: float) -> None:
+        """Изменяет срок свежести записи."""
+        self._connection().execute(
+            "UPDATE responses SET expires_at = ?, last_access = ? WHERE key = ?",
+            (expires_at, time.time(), key)
+        )
+
+    def refresh(self, key: str, entry: Dict[str, Any], response: requests.Response,
+                expires_at: float) -> Dict[str, Any]:
+        """Обновляет заголовки, валидаторы и срок свежести записи по ответу 304 (RFC 9111, 4.3.4)."""
+        headers = dict(entry["headers"])
+        stored = {name.lower(): name for name in headers}
+        for name, value in response.headers.items():
+            if name.lower() in BODY_HEADERS:
+                continue
+            headers.pop(stored.get(name.lower(), name), None)
+            headers[name] = value
+
+        refreshed = {
+            **entry,
+            "headers": headers,
+            "etag": response.headers.get("ETag", entry["etag"]),
+            "last_modified": response.headers.get("Last-Modified", entry["last_modified"]),
+            "expires_at": expires_at,
+        }
+        self._connection().execute(
+            "UPDATE responses SET headers = ?, etag = ?, last_modified = ?, expires_at = ?, last_access = ? "
+            "WHERE key = ?",
+            (json.dumps(headers), refreshed["etag"], refreshed["last_modified"], expires_at, time.time(), key)
+        )
+        return refreshed
+
+    def delete(self, key: str) -> None:
+        """Удаляет запись, которую больше нельзя перепроверить."""
+        self._connection().execute("DELETE FROM responses WHERE key = ?", (key,))
+
+    def _evict(self, connection: sqlite3.Connection) -> None:
+        total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in connection.execute(
+            "SELECT key, size FROM responses ORDER BY last_access"
+        ).fetchall():
+            connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def close(self) -> None:
+        """Закрывает соединение текущего потока."""
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+
+class TimeoutAdapter(HTTPAdapter):
+    """Транспортный адаптер requests с тайм-аутом по умолчанию для запросов без timeout.
+
+    Атрибут Session.timeout requests не читает, поэтому тайм-аут задается на уровне адаптера.
+    """
+
+    def __init__(self, timeout: Optional[float] = None, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.timeout = timeout
+
+    def send(self, request: requests.PreparedRequest, **kwargs: Any) -> requests.Response:
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        return super().send(request, **kwargs)
+
+
+class CachingAdapter(TimeoutAdapter):
+    """Транспортный адаптер requests, отвечающий из кэша и перепроверяющий устаревшие записи."""
+
+    def __init__(self, cache: ResponseCache, default_ttl: float = 0.0, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.cache = cache
+        self.default_ttl = default_ttl
+        self.stats = {"hits": 0, "misses": 0, "revalidated": 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, name: str) -> None:
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    @staticmethod
+    def cache_key(request: requests.PreparedRequest) -> str:
+        """Строит ключ из метода, URL с параметрами и заголовков, влияющих на ответ."""
+        parts = [request.method or "", request.url or ""]
+        parts += [f"{name}:{request.headers.get(name, '')}" for name in KEY_HEADERS]
+        return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+    def _from_cache(self, entry: Dict[str, Any], request: requests.PreparedRequest) -> requests.Response:
+        response = requests.Response()
+        response.status_code = entry["status"]
+        response.headers = CaseInsensitiveDict(entry["headers"])
+        response._content = entry["body"]
+        response.url = entry["url"]
+        response.reason = "OK"
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.request = request
+        response.connection = self
+        response.from_cache = True
+        return response
+
+    def send(self, request: requests.PreparedRequest, **kwargs: Any) -> requests.Response:
+        if request.method != "GET" or "no-cache" in request.headers.get("Cache-Control", ""):
+            return super().send(request, **kwargs)
+
+        key = self.cache_key(request)
+        entry = self.cache.get(key)
+        if entry is not None and entry["expires_at"] > time.time():
+            self._count("hits")
+            return self._from_cache(entry, request)
+
+        if entry is not None:
+            if entry["etag"]:
+                request.headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                request.headers["If-Modified-Since"] = entry["last_modified"]
+
+        response = super().send(request, **kwargs)
+
+        if entry is not None and response.status_code == 304:
+            self._count("revalidated")
+            expires_at = time.time() + freshness_lifetime(response.headers, self.default_ttl)
+            entry = self.cache.refresh(key, entry, response, expires_at)
+            # Дочитываем и закрываем ответ 304, чтобы соединение вернулось в пул
+            response.content
+            response.close()
+            return self._from_cache(entry, request)
+
+        self._count("misses")
+        if response.status_code == 200:
+            # Кэш личный и ключ включает API-ключ, поэтому Cache-Control: private не мешает хранению
+            expires_at = time.time() + freshness_lifetime(response.headers, self.default_ttl)
+            has_validators = "ETag" in response.headers or "Last-Modified" in response.headers
+            storable = "no-store" not in _cache_control(response.headers)
+            if storable and (expires_at > time.time() or has_validators):
+                self.cache.put(key, response, expires_at)
+            elif entry is not None:
+                self.cache.delete(key)
+        return response
+
+    def summary(self) -> str:
+        """Возвращает строку с долями попаданий, промахов и перепроверок."""
+        return format_stats(self.stats)
+
+    def close(self) -> None:
+        super().close()
+        self.cache.close()
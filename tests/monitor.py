@@ -0,0 +1,471 @@
+"""Демон синтетического мониторинга: API- и UI-проверки Кинопоиска по расписанию на прогретых сессиях."""
+import heapq
+import json
+import math
+import os
+import signal
+import sqlite3
+import threading
+import time
+import traceback
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+from api_session import API_TIMEOUT, create_api_client
+from test_api import TestKinopoiskAPI
+
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MONITOR_DB = os.getenv('MONITOR_DB', os.path.join(ROOT_DIR, ".monitor", "timeseries.sqlite"))
+MONITOR_HOST = os.getenv('MONITOR_HOST', '127.0.0.1')
+MONITOR_PORT = int(os.getenv('MONITOR_PORT', '8765'))
+MONITOR_SCHEDULE = os.getenv('MONITOR_SCHEDULE')
+MONITOR_API_INTERVAL = float(os.getenv('MONITOR_API_INTERVAL', '300'))
+MONITOR_UI_INTERVAL = float(os.getenv('MONITOR_UI_INTERVAL', '900'))
+MONITOR_UI = os.getenv('MONITOR_UI', '1') != '0'
+MONITOR_HEADLESS = os.getenv('MONITOR_HEADLESS', '1') != '0'
+MONITOR_BROWSER_RECYCLE = int(os.getenv('MONITOR_BROWSER_RECYCLE', '50'))
+MONITOR_PAGE_LOAD_TIMEOUT = float(os.getenv('MONITOR_PAGE_LOAD_TIMEOUT', '60'))
+MONITOR_RAW_RETENTION = float(os.getenv('MONITOR_RAW_RETENTION', str(24 * 3600)))
+MONITOR_ROLLUP_RETENTION = float(os.getenv('MONITOR_ROLLUP_RETENTION', str(30 * 24 * 3600)))
+MONITOR_ROLLUP_BUCKET = float(os.getenv('MONITOR_ROLLUP_BUCKET', '3600'))
+MONITOR_MAINTENANCE_INTERVAL = float(os.getenv('MONITOR_MAINTENANCE_INTERVAL', '600'))
+
+PAGE_TIMING_SCRIPT = (
+    "const entry = performance.getEntriesByType('navigation')[0];"
+    "return entry ? entry.toJSON() : null;"
+)
+PAGE_TIMING_METRICS = {
+    "ttfb": "responseStart",
+    "dom_content_loaded": "domContentLoadedEventEnd",
+    "load": "loadEventEnd",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    check_name TEXT NOT NULL,
+    ts REAL NOT NULL,
+    ok INTEGER NOT NULL,
+    duration REAL NOT NULL,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS results_ts ON results (ts);
+CREATE TABLE IF NOT EXISTS samples (
+    check_name TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    ts REAL NOT NULL,
+    value REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS samples_ts ON samples (ts);
+CREATE TABLE IF NOT EXISTS rollups (
+    check_name TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    bucket REAL NOT NULL,
+    count INTEGER NOT NULL,
+    total REAL NOT NULL,
+    min REAL NOT NULL,
+    max REAL NOT NULL,
+    p50 REAL NOT NULL,
+    p95 REAL NOT NULL,
+    PRIMARY KEY (check_name, metric, bucket)
+);
+"""
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Возвращает перцентиль методом ближайшего ранга."""
+    ordered = sorted(values)
+    rank = max(math.ceil(q / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+class TimeSeriesStore:
+    """Хранилище результатов проверок и замеров в SQLite с хранением сырых данных и агрегатами."""
+
+    def __init__(self, path: str = MONITOR_DB) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(SCHEMA)
+
+    def record(self, check_name: str, ok: bool, duration: float, error: Optional[str] = None,
+               samples: Optional[List[Tuple[str, float]]] = None, ts: Optional[float] = None) -> None:
+        """Сохраняет результат проверки, ее длительность и дополнительные замеры."""
+        ts = time.time() if ts is None else ts
+        rows = [(check_name, "duration", ts, duration)]
+        rows += [(check_name, metric, ts, value) for metric, value in samples or []]
+        with self._lock:
+            self._connection.execute("BEGIN")
+            try:
+                self._connection.execute(
+                    "INSERT INTO results (check_name, ts, ok, duration, error) VALUES (?, ?, ?, ?, ?)",
+                    (check_name, ts, int(ok), duration, error)
+                )
+                self._connection.executemany(
+                    "INSERT INTO samples (check_name, metric, ts, value) VALUES (?, ?, ?, ?)", rows
+                )
+                self._connection.execute("COMMIT")
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+
+    def stats(self, window: float, now: Optional[float] = None) -> Dict[str, Any]:
+        """Считает число запусков, падений и перцентили замеров за последние window секунд."""
+        since = (time.time() if now is None else now) - window
+        with self._lock:
+            results = self._connection.execute(
+                "SELECT check_name, COUNT(*), SUM(1 - ok) FROM results WHERE ts >= ? GROUP BY check_name",
+                (since,)
+            ).fetchall()
+            samples = self._connection.execute(
+                "SELECT check_name, metric, value FROM samples WHERE ts >= ?", (since,)
+            ).fetchall()
+
+        series: Dict[Tuple[str, str], List[float]] = {}
+        for check_name, metric, value in samples:
+            series.setdefault((check_name, metric), []).append(value)
+
+        report: Dict[str, Any] = {
+            check_name: {"runs": runs, "failures": failures, "metrics": {}}
+            for check_name, runs, failures in results
+        }
+        for (check_name, metric), values in series.items():
+            report.setdefault(check_name, {"runs": 0, "failures": 0, "metrics": {}})
+            report[check_name]["metrics"][metric] = {
+                "count": len(values),
+                "p50": percentile(values, 50),
+                "p90": percentile(values, 90),
+                "p99": percentile(values, 99),
+                "max": max(values),
+            }
+        return report
+
+    def failures(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Возвращает последние упавшие проверки."""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT check_name, ts, duration, error FROM results WHERE ok = 0 ORDER BY ts DESC LIMIT ?",
+                (limit,)
+            ).fetchall()
+        return [
+            {"check": check_name, "ts": ts, "duration": duration, "error": error}
+            for check_name, ts, duration, error in rows
+        ]
+
+    def rollups(self, check_name: str, metric: str) -> List[Dict[str, Any]]:
+        """Возвращает агрегаты ряда по интервалам."""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT bucket, count, total, min, max, p50, p95 FROM rollups "
+                "WHERE check_name = ? AND metric = ? ORDER BY bucket",
+                (check_name, metric)
+            ).fetchall()
+        return [
+            {"bucket": bucket, "count": count, "mean": total / count, "min": low, "max": high,
+             "p50": p50, "p95": p95}
+            for bucket, count, total, low, high, p50, p95 in rows
+        ]
+
+    def downsample(self, raw_retention: float = MONITOR_RAW_RETENTION,
+                   rollup_retention: float = MONITOR_ROLLUP_RETENTION,
+                   bucket: float = MONITOR_ROLLUP_BUCKET, now: Optional[float] = None) -> int:
+        """Сворачивает сырые замеры старше raw_retention в агрегаты и удаляет устаревшие данные."""
+        now = time.time() if now is None else now
+        # Граница выровнена по интервалу, чтобы агрегат всегда строился по целому интервалу
+        cutoff = math.floor((now - raw_retention) / bucket) * bucket
+
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._connection.execute(
+                    "SELECT check_name, metric, ts, value FROM samples WHERE ts < ?", (cutoff,)
+                ).fetchall()
+                groups: Dict[Tuple[str, str, float], List[float]] = {}
+                for check_name, metric, ts, value in rows:
+                    key = (check_name, metric, math.floor(ts / bucket) * bucket)
+                    groups.setdefault(key, []).append(value)
+
+                self._connection.executemany(
+                    "INSERT OR REPLACE INTO rollups "
+                    "(check_name, metric, bucket, count, total, min, max, p50, p95) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (check_name, metric, start, len(values), sum(values), min(values), max(values),
+                         percentile(values, 50), percentile(values, 95))
+                        for (check_name, metric, start), values in groups.items()
+                    ]
+                )
+                self._connection.execute("DELETE FROM samples WHERE ts < ?", (cutoff,))
+                self._connection.execute("DELETE FROM results WHERE ts < ?", (now - rollup_retention,))
+                self._connection.execute("DELETE FROM rollups WHERE bucket < ?", (now - rollup_retention,))
+                self._connection.execute("COMMIT")
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+        return len(groups)
+
+    def close(self) -> None:
+        """Закрывает соединение с базой."""
+        with self._lock:
+            self._connection.close()
+
+
+@dataclass(order=True)
+class Check:
+    """Проверка с периодом запуска; kind определяет поток и прогретый ресурс, на котором она идет."""
+
+    due: float
+    name: str = field(compare=False)
+    kind: str = field(compare=False)
+    interval: float = field(compare=False)
+    run: Callable[[Any], None] = field(compare=False)
+
+
+def load_schedule(path: Optional[str] = MONITOR_SCHEDULE) -> Dict[str, float]:
+    """Загружает периоды проверок в секундах из JSON вида {"test_api_key_valid": 60}."""
+    if not path:
+        return {}
+    with open(path, encoding="utf-8") as schedule_file:
+        return {name: float(interval) for name, interval in json.load(schedule_file).items()}
+
+
+def discover_checks(schedule: Dict[str, float], include_ui: bool = MONITOR_UI) -> List[Check]:
+    """Собирает API-проверки из TestKinopoiskAPI и UI-проверки из test_ui.
+
+    Имя в расписании, не совпадающее ни с одной проверкой, считается опечаткой и отклоняется.
+    """
+    candidates: List[Tuple[str, str, Callable[[Any], None], float]] = []
+    api_tests = TestKinopoiskAPI()
+    for name in sorted(dir(api_tests)):
+        if name.startswith("test_"):
+            candidates.append((name, "api", getattr(api_tests, name), MONITOR_API_INTERVAL))
+
+    if include_ui:
+        # Selenium подключается только при включенных UI-проверках
+        import test_ui
+
+        for name in sorted(dir(test_ui)):
+            if name.startswith("test_ui_"):
+                candidates.append((name, "ui", getattr(test_ui, name), MONITOR_UI_INTERVAL))
+
+    known = {name for name, _, _, _ in candidates}
+    # Без UI-проверок test_ui не импортируется, поэтому их имена в расписании не сверяются
+    unknown = sorted(
+        name for name in schedule
+        if name not in known and (include_ui or not name.startswith("test_ui_"))
+    )
+    if unknown:
+        raise ValueError(f"В расписании мониторинга неизвестные проверки: {', '.join(unknown)}")
+
+    now = time.time()
+    checks = []
+    for name, kind, run, default_interval in candidates:
+        interval = schedule.get(name, default_interval)
+        if interval > 0:
+            checks.append(Check(now, name, kind, interval, run))
+    return checks
+
+
+class ApiWorker:
+    """Держит прогретую сессию API без кэша и собирает задержки всех запросов во время проверки."""
+
+    kind = "api"
+
+    def __init__(self, timeout: float = API_TIMEOUT) -> None:
+        # Без HTTP-кэша: свежая запись из кэша означала бы «успешную» проверку без обращения к API
+        # Тайм-аут по умолчанию не дает зависшему запросу остановить поток API-проверок
+        self.session = create_api_client(cache=False, timeout=timeout)
+        self.latencies: List[float] = []
+        self.session.hooks["response"].append(self._on_response)
+
+    def _on_response(self, response: requests.Response, *args: Any, **kwargs: Any) -> None:
+        self.latencies.append(response.elapsed.total_seconds())
+
+    def run(self, check: Check) -> List[Tuple[str, float]]:
+        self.latencies = []
+        check.run(self.session)
+        return [("request_latency", latency) for latency in self.latencies]
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class UiWorker:
+    """Держит прогретый браузер, пересоздавая его после сбоя или каждые MONITOR_BROWSER_RECYCLE запусков."""
+
+    kind = "ui"
+
+    def __init__(self, headless: bool = MONITOR_HEADLESS, recycle: int = MONITOR_BROWSER_RECYCLE,
+                 page_load_timeout: float = MONITOR_PAGE_LOAD_TIMEOUT) -> None:
+        self.headless = headless
+        self.recycle = recycle
+        self.page_load_timeout = page_load_timeout
+        self.browser = None
+        self.runs = 0
+
+    def _ensure_browser(self) -> Any:
+        if self.browser is not None and self.runs >= self.recycle:
+            self.close()
+        if self.browser is None:
+            from test_ui import create_browser
+
+            self.browser = create_browser(headless=self.headless)
+            self.browser.set_page_load_timeout(self.page_load_timeout)
+            self.runs = 0
+        return self.browser
+
+    def run(self, check: Check) -> List[Tuple[str, float]]:
+        browser = self._ensure_browser()
+        self.runs += 1
+        try:
+            check.run(browser)
+        except Exception:
+            # Сбой при проверке браузера или его закрытии не должен подменять исходную ошибку проверки
+            try:
+                browser.current_url
+            except Exception:
+                try:
+                    self.close()
+                except Exception as e:
+                    print(f"⚠ Не удалось закрыть браузер: {e}")
+            raise
+
+        timing = browser.execute_script(PAGE_TIMING_SCRIPT) or {}
+        return [
+            (metric, timing[key] / 1000)
+            for metric, key in PAGE_TIMING_METRICS.items()
+            if timing.get(key)
+        ]
+
+    def close(self) -> None:
+        if self.browser is not None:
+            try:
+                self.browser.quit()
+            finally:
+                self.browser = None
+
+
+class Monitor:
+    """Планировщик: по одному потоку на вид проверок, чтобы медленные UI-проверки не задерживали API."""
+
+    def __init__(self, store: TimeSeriesStore, checks: List[Check]) -> None:
+        self.store = store
+        self.checks = checks
+        self.stop_event = threading.Event()
+        self.threads: List[threading.Thread] = []
+
+    def run_check(self, worker: Any, check: Check) -> None:
+        """Выполняет проверку и сохраняет результат с замерами."""
+        started = time.perf_counter()
+        try:
+            samples = worker.run(check)
+        except Exception as e:
+            duration = time.perf_counter() - started
+            print(f"❌ {check.name}: {e}")
+            self.store.record(check.name, False, duration, traceback.format_exc(limit=5), [])
+            return
+        duration = time.perf_counter() - started
+        print(f"✅ {check.name}: {duration:.2f} с")
+        self.store.record(check.name, True, duration, None, samples)
+
+    def _loop(self, worker_factory: Callable[[], Any], checks: List[Check]) -> None:
+        worker = worker_factory()
+        queue = list(checks)
+        heapq.heapify(queue)
+        try:
+            while queue and not self.stop_event.is_set():
+                check = heapq.heappop(queue)
+                if self.stop_event.wait(max(check.due - time.time(), 0)):
+                    break
+                self.run_check(worker, check)
+                check.due = max(check.due + check.interval, time.time())
+                heapq.heappush(queue, check)
+        finally:
+            worker.close()
+
+    def start(self) -> None:
+        """Запускает потоки проверок."""
+        for worker_factory in (ApiWorker, UiWorker):
+            checks = [check for check in self.checks if check.kind == worker_factory.kind]
+            if not checks:
+                continue
+            thread = threading.Thread(
+                target=self._loop, args=(worker_factory, checks), name=f"monitor-{worker_factory.kind}", daemon=True
+            )
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self) -> None:
+        """Останавливает потоки после завершения текущих проверок."""
+        self.stop_event.set()
+        for thread in self.threads:
+            thread.join()
+
+
+def make_handler(store: TimeSeriesStore) -> type:
+    """Создает обработчик HTTP с эндпоинтами /stats, /failures и /rollups."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            url = urlparse(self.path)
+            query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+            try:
+                if url.path == "/stats":
+                    body: Any = store.stats(float(query.get("window", 3600)))
+                elif url.path == "/failures":
+                    body = store.failures(int(query.get("limit", 50)))
+                elif url.path == "/rollups":
+                    body = store.rollups(query["check"], query.get("metric", "duration"))
+                else:
+                    self.send_error(404)
+                    return
+            except (KeyError, ValueError) as e:
+                self.send_error(400, str(e))
+                return
+
+            payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+    return Handler
+
+
+def main() -> None:
+    """Запускает проверки, HTTP-эндпоинт и периодическое обслуживание хранилища."""
+    store = TimeSeriesStore(MONITOR_DB)
+    checks = discover_checks(load_schedule())
+    monitor = Monitor(store, checks)
+    server = ThreadingHTTPServer((MONITOR_HOST, MONITOR_PORT), make_handler(store))
+    server_thread = threading.Thread(target=server.serve_forever, name="monitor-http", daemon=True)
+
+    signal.signal(signal.SIGTERM, lambda signum, frame: monitor.stop_event.set())
+
+    print(f"🚀 Мониторинг: {len(checks)} проверок, http://{MONITOR_HOST}:{MONITOR_PORT}/stats")
+    monitor.start()
+    server_thread.start()
+    try:
+        while not monitor.stop_event.wait(MONITOR_MAINTENANCE_INTERVAL):
+            store.downsample()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        monitor.stop()
+        store.close()
+        print("🏁 Мониторинг остановлен")
+
+
+if __name__ == "__main__":
+    main()
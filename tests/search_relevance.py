@@ -0,0 +1,295 @@
+"""Прогон корпуса поисковых запросов и оценка релевантности поиска API Кинопоиска."""
+import json
+import os
+import re
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Set, Tuple
+
+import requests
+
+from api_session import API_TIMEOUT
+
+
+SEARCH_URL = "https://api.kinopoisk.dev/v1.4/movie/search"
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "data", "search_corpus.json")
+
+NGRAM_SIZE = 3
+# Порог только для подсказки ближайшего названия в отчете о промахах, не для засчитывания попадания
+MATCH_THRESHOLD = 0.6
+
+# Латиница переводится в кириллицу: сначала многобуквенные сочетания, потом одиночные буквы
+LATIN_TO_CYRILLIC: Tuple[Tuple[str, str], ...] = (
+    ("shch", "щ"), ("sch", "щ"),
+    ("yo", "е"), ("yu", "ю"), ("ya", "я"),
+    ("zh", "ж"), ("kh", "х"), ("ch", "ч"), ("sh", "ш"), ("ts", "ц"),
+    ("a", "а"), ("b", "б"), ("c", "к"), ("d", "д"), ("e", "е"), ("f", "ф"),
+    ("g", "г"), ("h", "х"), ("i", "и"), ("j", "дж"), ("k", "к"), ("l", "л"),
+    ("m", "м"), ("n", "н"), ("o", "о"), ("p", "п"), ("q", "к"), ("r", "р"),
+    ("s", "с"), ("t", "т"), ("u", "у"), ("v", "в"), ("w", "в"), ("x", "кс"),
+    ("y", "и"), ("z", "з"),
+)
+
+CYRILLIC_TO_LATIN: Dict[str, str] = {
+    "а": "a", "б": "b", "в": "v", "г": "g", "д": "d", "е": "e", "ё": "yo",
+    "ж": "zh", "з": "z", "и": "i", "й": "y", "к": "k", "л": "l", "м": "m",
+    "н": "n", "о": "o", "п": "p", "р": "r", "с": "s", "т": "t", "у": "u",
+    "ф": "f", "х": "kh", "ц": "ts", "ч": "ch", "ш": "sh", "щ": "shch",
+    "ъ": "", "ы": "y", "ь": "", "э": "e", "ю": "yu", "я": "ya",
+}
+
+# Буквы, которые в запросах пишут взаимозаменяемо: Шрек/Шрэк, Ёлки/Елки, Мой/Мои
+CYRILLIC_FOLD = str.maketrans({"ё": "е", "э": "е", "й": "и", "ы": "и", "ъ": None, "ь": None})
+
+_LATIN_RE = re.compile("|".join(latin for latin, _ in LATIN_TO_CYRILLIC))
+_LATIN_MAP = dict(LATIN_TO_CYRILLIC)
+_NON_WORD_RE = re.compile(r"[\W_]+")
+
+
+def normalize_title(text: str) -> str:
+    """Приводит название к единому виду без учета регистра, ё/е и транслитерации."""
+    text = text.lower()
+    text = _LATIN_RE.sub(lambda match: _LATIN_MAP[match.group(0)], text)
+    text = text.translate(CYRILLIC_FOLD).replace("тс", "ц")
+    return _NON_WORD_RE.sub(" ", text).strip()
+
+
+def transliterate(text: str) -> str:
+    """Переводит кириллическое название в латиницу, как его набирают без русской раскладки."""
+    result = []
+    for char in text:
+        latin = CYRILLIC_TO_LATIN.get(char.lower())
+        if latin is None:
+            result.append(char)
+        elif char.isupper():
+            result.append(latin.capitalize())
+        else:
+            result.append(latin)
+    return "".join(result)
+
+
+def title_ngrams(normalized: str, size: int = NGRAM_SIZE) -> Set[str]:
+    """Возвращает множество n-грамм нормализованного названия с отступами по краям."""
+    padded = " " * (size - 1) + normalized + " " * (size - 1)
+    return {padded[i:i + size] for i in range(len(padded) - size + 1)}
+
+
+class TitleIndex:
+    """Предрассчитанный n-граммный индекс известных названий фильмов, ключ — id Кинопоиска."""
+
+    def __init__(self, titles: Iterable[Mapping[str, Any]]) -> None:
+        self.titles: Dict[int, Dict[str, Any]] = {}
+        self._grams: Dict[Tuple[int, str], Set[str]] = {}
+        self._postings: Dict[str, Set[Tuple[int, str]]] = defaultdict(set)
+        self._exact: Dict[str, Optional[int]] = {}
+
+        for title in titles:
+            if title.get("id") is None:
+                raise ValueError(f"У названия корпуса нет id Кинопоиска: {title['name']}")
+            kp_id = int(title["id"])
+            if kp_id in self.titles:
+                raise ValueError(f"id {kp_id} повторяется в корпусе")
+            self.titles[kp_id] = dict(title)
+
+            for alias in self._aliases(title):
+                normalized = normalize_title(alias)
+                if not normalized or (kp_id, normalized) in self._grams:
+                    continue
+                # Одинаковое название у разных фильмов (ремейк) не годится для сопоставления без id
+                self._exact[normalized] = kp_id if normalized not in self._exact else None
+                grams = title_ngrams(normalized)
+                self._grams[(kp_id, normalized)] = grams
+                for gram in grams:
+                    self._postings[gram].add((kp_id, normalized))
+
+    @staticmethod
+    def _aliases(title: Mapping[str, Any]) -> List[str]:
+        return [title["name"], *filter(None, [title.get("enName")]), *title.get("aliases", [])]
+
+    def lookup(self, text: str, threshold: float = MATCH_THRESHOLD) -> Optional[int]:
+        """Находит id известного названия, наиболее похожего на текст (коэффициент Жаккара по n-граммам).
+
+        Нечеткое совпадение объединяет фильм с его продолжениями и ремейками,
+        поэтому используется только для диагностики промахов, а не в resolve.
+        """
+        normalized = normalize_title(text)
+        if not normalized:
+            return None
+
+        grams = title_ngrams(normalized)
+        overlap: Dict[Tuple[int, str], int] = defaultdict(int)
+        for gram in grams:
+            for entry in self._postings.get(gram, ()):
+                overlap[entry] += 1
+
+        best_id, best_score = None, 0.0
+        for entry, common in overlap.items():
+            score = common / (len(grams) + len(self._grams[entry]) - common)
+            if score > best_score:
+                best_id, best_score = entry[0], score
+
+        return best_id if best_score >= threshold else None
+
+    def resolve(self, movie: Mapping[str, Any]) -> Optional[int]:
+        """Сопоставляет фильм из ответа API с id известного названия.
+
+        Фильм с id сопоставляется только по id: продолжение или ремейк с тем же
+        названием не считается попаданием. Без id допускается лишь однозначное
+        точное совпадение нормализованного названия.
+        """
+        if movie.get("id") is not None:
+            kp_id = int(movie["id"])
+            return kp_id if kp_id in self.titles else None
+
+        candidates = [movie.get("name"), movie.get("alternativeName"), movie.get("enName")]
+        candidates += [item.get("name") for item in movie.get("names") or []]
+        for candidate in filter(None, candidates):
+            kp_id = self._exact.get(normalize_title(candidate))
+            if kp_id is not None:
+                return kp_id
+        return None
+
+
+def expand_queries(titles: Iterable[Mapping[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """Порождает варианты написания запросов для каждого известного названия.
+
+    Замена е на э порождается только вручную в корпусе (Шрэк): автоматическая
+    замена дает написания, которые никто не набирает.
+    """
+    for title in titles:
+        name = title["name"]
+        variants = {
+            "exact": name,
+            "lower": name.lower(),
+            "upper": name.upper(),
+            "translit": transliterate(name),
+        }
+        if "ё" in name.lower():
+            variants["yo_fold"] = name.replace("ё", "е").replace("Ё", "Е")
+        if title.get("enName"):
+            variants["en"] = title["enName"]
+
+        for query_class, query in variants.items():
+            yield {"query": query, "class": query_class, "expected": [int(title["id"])]}
+
+
+def _expected_ids(query: Mapping[str, Any], ids_by_name: Mapping[str, List[int]],
+                  known_ids: Set[int]) -> List[int]:
+    """Переводит ожидаемые названия запроса в id; id из корпуса принимаются как есть."""
+    expected = []
+    for item in query["expected"]:
+        if isinstance(item, int):
+            ids = [item] if item in known_ids else []
+        else:
+            ids = ids_by_name.get(item, [])
+        if not ids:
+            raise ValueError(f"Запрос '{query['query']}' ожидает неизвестное название: {item}")
+        if len(ids) > 1:
+            raise ValueError(f"Запрос '{query['query']}': название '{item}' неоднозначно, укажите id")
+        expected.append(ids[0])
+    return expected
+
+
+def load_corpus(path: str = CORPUS_PATH) -> Dict[str, Any]:
+    """Загружает корпус: известные названия, запросы (явные и порожденные) и пороги метрик.
+
+    В expected запроса допускаются id Кинопоиска или однозначные названия из titles;
+    после загрузки expected всегда содержит id.
+    """
+    with open(path, encoding="utf-8") as corpus_file:
+        corpus = json.load(corpus_file)
+
+    # Построение индекса проверяет наличие и уникальность id
+    known_ids = set(TitleIndex(corpus["titles"]).titles)
+    ids_by_name: Dict[str, List[int]] = defaultdict(list)
+    for title in corpus["titles"]:
+        ids_by_name[title["name"]].append(int(title["id"]))
+
+    queries = [
+        {**query, "expected": _expected_ids(query, ids_by_name, known_ids)}
+        for query in corpus.get("queries", [])
+    ]
+    if corpus.get("expand", True):
+        queries.extend(expand_queries(corpus["titles"]))
+    corpus["queries"] = queries
+    corpus.setdefault("thresholds", {})
+    return corpus
+
+
+def run_queries(
+    api_client: requests.Session,
+    queries: List[Dict[str, Any]],
+    limit: int = 10,
+    workers: int = 8,
+) -> List[Dict[str, Any]]:
+    """Параллельно выполняет поисковые запросы; каждый поток работает со своей сессией и общими адаптерами."""
+    local = threading.local()
+
+    def get_session() -> requests.Session:
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+            local.session.headers.update(api_client.headers)
+            for prefix, adapter in api_client.adapters.items():
+                local.session.mount(prefix, adapter)
+        return local.session
+
+    def search(query: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            response = get_session().get(
+                SEARCH_URL,
+                params={"query": query["query"], "limit": limit},
+                timeout=API_TIMEOUT
+            )
+            response.raise_for_status()
+            return {**query, "docs": response.json().get("docs", []), "error": None}
+        except (requests.RequestException, ValueError) as e:
+            return {**query, "docs": [], "error": str(e)}
+
+    # Адаптеры принадлежат api_client и закрываются вместе с ним
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(search, queries))
+
+
+def score_results(index: TitleIndex, results: Iterable[Mapping[str, Any]]) -> Dict[str, Dict[str, float]]:
+    """Считает recall и MRR по классам запросов."""
+    totals: Dict[str, Dict[str, float]] = defaultdict(
+        lambda: {"queries": 0, "errors": 0, "recall": 0.0, "mrr": 0.0}
+    )
+
+    for result in results:
+        stats = totals[result["class"]]
+        stats["queries"] += 1
+        if result["error"]:
+            stats["errors"] += 1
+            continue
+
+        expected = set(result["expected"])
+        found: Set[int] = set()
+        reciprocal_rank = 0.0
+        for rank, movie in enumerate(result["docs"], start=1):
+            kp_id = index.resolve(movie)
+            if kp_id in expected:
+                if not found:
+                    reciprocal_rank = 1.0 / rank
+                found.add(kp_id)
+
+        stats["recall"] += len(found) / len(expected) if expected else 1.0
+        stats["mrr"] += reciprocal_rank
+
+    for stats in totals.values():
+        stats["recall"] /= stats["queries"]
+        stats["mrr"] /= stats["queries"]
+    return dict(totals)
+
+
+def format_report(report: Mapping[str, Mapping[str, float]]) -> str:
+    """Форматирует метрики по классам запросов в текстовую таблицу."""
+    lines = [f"{'class':<12} {'queries':>8} {'errors':>7} {'recall':>7} {'mrr':>7}"]
+    for query_class in sorted(report):
+        stats = report[query_class]
+        lines.append(
+            f"{query_class:<12} {int(stats['queries']):>8} {int(stats['errors']):>7} "
+            f"{stats['recall']:>7.3f} {stats['mrr']:>7.3f}"
+        )
+    return "\n".join(lines)
@@ -1,30 +1,9 @@
 """Модуль для тестирования API Кинопоиска."""
-import os
 import sys
-from typing import Generator, Any
 
 import allure
 import pytest
 import requests
-from dotenv import load_dotenv
-
-load_dotenv()
-
-
-API_KEY = os.getenv('KINOPOISK_API_KEY')
-
-
-@pytest.fixture(scope='session')
-def api_client() -> Generator[requests.Session, Any, None]:
-    """Фикстура для API клиента с правильными заголовками."""
-    session = requests.Session()
-    session.headers.update({
-        "X-API-KEY": API_KEY,
-        "accept": "application/json"
-    })
-    session.timeout = 10
-    yield session
-    session.close()
 
 
 @allure.feature("API Tests")
@@ -0,0 +1,228 @@
+"""Модуль для проверки HTTP-кэша сессии API без обращения к сети."""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Generator, List
+
+import allure
+import pytest
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from http_cache import CachingAdapter, ResponseCache
+
+
+MOVIE_URL = "https://api.kinopoisk.dev/v1.4/movie"
+
+
+@pytest.fixture
+def fake_server(monkeypatch: pytest.MonkeyPatch) -> List[Dict[str, Any]]:
+    """Фикстура, подменяющая сетевой транспорт и записывающая отправленные запросы."""
+    sent: List[Dict[str, Any]] = []
+
+    def send(adapter: HTTPAdapter, request: requests.PreparedRequest, **kwargs: Any) -> requests.Response:
+        sent.append(dict(request.headers))
+        response = requests.Response()
+        response.request = request
+        response.url = request.url
+        if request.headers.get("If-None-Match") == '"v1"':
+            response.status_code = 304
+            response.headers = CaseInsensitiveDict({"Cache-Control": "max-age=60"})
+            response._content = b""
+        else:
+            response.status_code = 200
+            response.headers = CaseInsensitiveDict({"ETag": '"v1"', "Content-Type": "application/json"})
+            response._content = b'{"docs": [{"name": "' + request.url.encode()[-8:] + b'"}]}'
+        return response
+
+    monkeypatch.setattr(HTTPAdapter, "send", send)
+    return sent
+
+
+@pytest.fixture
+def keep_alive_server() -> Generator[Dict[str, Any], Any, None]:
+    """Фикстура с локальным HTTP/1.1-сервером, считающим TCP-соединения."""
+    state: Dict[str, Any] = {"connections": 0, "cache_control": None}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def setup(self) -> None:
+            super().setup()
+            state["connections"] += 1
+
+        def do_GET(self) -> None:
+            if self.headers.get("If-None-Match") == '"v1"':
+                self.send_response(304)
+                self.send_header("ETag", '"v1"')
+                self.end_headers()
+                return
+            body = b'{"docs": []}'
+            self.send_response(200)
+            self.send_header("ETag", '"v1"')
+            if state["cache_control"]:
+                self.send_header("Cache-Control", state["cache_control"])
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    state["url"] = f"http://127.0.0.1:{server.server_port}/v1.4/movie"
+    yield state
+    server.shutdown()
+    server.server_close()
+
+
+def make_session(tmp_path: Any, max_bytes: int = 1024 * 1024) -> requests.Session:
+    session = requests.Session()
+    session.headers.update({"X-API-KEY": "test", "accept": "application/json"})
+    session.mount("https://", CachingAdapter(ResponseCache(str(tmp_path / "cache.sqlite"), max_bytes)))
+    return session
+
+
+@allure.feature("API Tests")
+@allure.title("Перепроверка и выдача ответов из HTTP-кэша")
+@allure.story("Cache")
+def test_http_cache_revalidation(tmp_path: Any, fake_server: List[Dict[str, Any]]) -> None:
+    """Тест условных запросов: промах, перепроверка с 304 и выдача свежей записи без запроса."""
+    session = make_session(tmp_path)
+    adapter = session.get_adapter(MOVIE_URL)
+
+    with allure.step("Первый запрос сохраняется в кэш"):
+        first = session.get(MOVIE_URL, params={"limit": 1})
+        assert first.json()["docs"], "Ответ не содержит ключ 'docs'"
+
+    with allure.step("Повторный запрос перепроверяется через If-None-Match"):
+        second = session.get(MOVIE_URL, params={"limit": 1})
+        assert fake_server[-1].get("If-None-Match") == '"v1"'
+        assert second.json() == first.json()
+
+    with allure.step("Свежая запись выдается без запроса"):
+        third = session.get(MOVIE_URL, params={"limit": 1})
+        assert len(fake_server) == 2, "Свежая запись не должна порождать запрос"
+        assert third.json() == first.json()
+
+    assert adapter.stats == {"hits": 1, "misses": 1, "revalidated": 1}
+    session.close()
+
+
+@allure.feature("API Tests")
+@allure.title("Вытеснение записей HTTP-кэша по LRU")
+@allure.story("Cache")
+def test_http_cache_lru_eviction(tmp_path: Any, fake_server: List[Dict[str, Any]]) -> None:
+    """Тест вытеснения давно не использованных записей при превышении размера."""
+    session = make_session(tmp_path, max_bytes=80)
+    cache = session.get_adapter(MOVIE_URL).cache
+
+    for limit in (1, 2, 1, 3):
+        session.get(MOVIE_URL, params={"limit": limit})
+
+    keys = {
+        limit: CachingAdapter.cache_key(session.prepare_request(
+            requests.Request("GET", MOVIE_URL, params={"limit": limit})
+        ))
+        for limit in (1, 2, 3)
+    }
+    assert cache.get(keys[2]) is None, "Давно не использованная запись должна быть вытеснена"
+    assert cache.get(keys[1]) is not None
+    assert cache.get(keys[3]) is not None
+    session.close()
+
+
+@allure.feature("API Tests")
+@allure.title("Повторное использование соединения при перепроверке")
+@allure.story("Cache")
+def test_http_cache_revalidation_reuses_connection(tmp_path: Any, keep_alive_server: Dict[str, Any]) -> None:
+    """Тест, что ответы 304 возвращают соединение в пул."""
+    session = make_session(tmp_path)
+    session.mount("http://", session.get_adapter(MOVIE_URL))
+
+    for _ in range(6):
+        assert session.get(keep_alive_server["url"], params={"limit": 1}).json() == {"docs": []}
+
+    assert session.get_adapter(MOVIE_URL).stats == {"hits": 0, "misses": 1, "revalidated": 5}
+    assert keep_alive_server["connections"] == 1, "Перепроверки должны идти по одному соединению"
+    session.close()
+
+
+@allure.feature("API Tests")
+@allure.title("Хранение private-ответов и удаление записей без валидаторов")
+@allure.story("Cache")
+def test_http_cache_private_and_stale_entries(tmp_path: Any, fake_server: List[Dict[str, Any]],
+                                              monkeypatch: pytest.MonkeyPatch) -> None:
+    """Тест, что private-ответ кэшируется, а запись без валидаторов удаляется после ответа 200."""
+    session = make_session(tmp_path)
+    adapter = session.get_adapter(MOVIE_URL)
+    key = CachingAdapter.cache_key(session.prepare_request(
+        requests.Request("GET", MOVIE_URL, params={"limit": 1})
+    ))
+    original_send = HTTPAdapter.send
+
+    def send_private(*args: Any, **kwargs: Any) -> requests.Response:
+        response = original_send(*args, **kwargs)
+        response.headers["Cache-Control"] = "private, max-age=60"
+        return response
+
+    with allure.step("Ответ с Cache-Control: private сохраняется в личный кэш"):
+        monkeypatch.setattr(HTTPAdapter, "send", send_private)
+        session.get(MOVIE_URL, params={"limit": 1})
+        assert adapter.cache.get(key) is not None
+
+    def send_without_validators(adapter: HTTPAdapter, request: requests.PreparedRequest,
+                                **kwargs: Any) -> requests.Response:
+        # Содержимое изменилось: сервер отвечает 200 и больше не присылает ETag
+        request.headers.pop("If-None-Match", None)
+        response = original_send(adapter, request, **kwargs)
+        del response.headers["ETag"]
+        return response
+
+    with allure.step("Устаревшая запись удаляется, если новый ответ нельзя перепроверить"):
+        adapter.cache.touch(key, 0)
+        monkeypatch.setattr(HTTPAdapter, "send", send_without_validators)
+        session.get(MOVIE_URL, params={"limit": 1})
+        assert adapter.cache.get(key) is None
+    session.close()
+
+
+@allure.feature("API Tests")
+@allure.title("Обновление заголовков записи по ответу 304")
+@allure.story("Cache")
+def test_http_cache_refreshes_headers_on_304(tmp_path: Any, fake_server: List[Dict[str, Any]],
+                                             monkeypatch: pytest.MonkeyPatch) -> None:
+    """Тест, что ответ 304 обновляет сохраненные заголовки и валидаторы записи."""
+    session = make_session(tmp_path)
+    adapter = session.get_adapter(MOVIE_URL)
+    key = CachingAdapter.cache_key(session.prepare_request(
+        requests.Request("GET", MOVIE_URL, params={"limit": 1})
+    ))
+    original_send = HTTPAdapter.send
+    session.get(MOVIE_URL, params={"limit": 1})
+
+    def send_new_validators(*args: Any, **kwargs: Any) -> requests.Response:
+        response = original_send(*args, **kwargs)
+        response.headers.update({
+            "ETag": '"v2"',
+            "Last-Modified": "Wed, 21 Oct 2026 07:28:00 GMT",
+            "Cache-Control": "max-age=0",
+        })
+        return response
+
+    with allure.step("Ответ 304 приносит новые валидаторы и заголовки"):
+        monkeypatch.setattr(HTTPAdapter, "send", send_new_validators)
+        revalidated = session.get(MOVIE_URL, params={"limit": 1})
+        assert revalidated.headers["ETag"] == '"v2"'
+        assert revalidated.headers["Content-Type"] == "application/json"
+
+    with allure.step("Запись хранит новые валидаторы и отправляет их при следующей перепроверке"):
+        entry = adapter.cache.get(key)
+        assert entry["etag"] == '"v2"'
+        assert entry["last_modified"] == "Wed, 21 Oct 2026 07:28:00 GMT"
+        assert entry["headers"]["Cache-Control"] == "max-age=0"
+        session.get(MOVIE_URL, params={"limit": 1})
+        assert fake_server[-1]["If-None-Match"] == '"v2"'
+    session.close()
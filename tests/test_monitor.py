@@ -0,0 +1,183 @@
+"""Модуль для проверки хранилища и планировщика демона мониторинга без обращения к сети."""
+import json
+import socket
+import threading
+import time
+from http.server import ThreadingHTTPServer
+from typing import Any, List, Tuple
+from urllib.request import urlopen
+
+import allure
+import pytest
+import requests
+from requests.adapters import HTTPAdapter
+
+from http_cache import CachingAdapter
+from monitor import ApiWorker, Check, Monitor, TimeSeriesStore, UiWorker, discover_checks, make_handler
+
+
+class FakeWorker:
+    """Рабочий, выполняющий проверку без сети и возвращающий фиксированные замеры."""
+
+    def run(self, check: Check) -> List[Tuple[str, float]]:
+        check.run(None)
+        return [("request_latency", 0.25)]
+
+
+def failing_check(_: Any) -> None:
+    raise AssertionError("API вернул статус 500")
+
+
+@allure.feature("Monitoring")
+@allure.title("Сохранение результатов и перцентили в хранилище мониторинга")
+@allure.story("Monitoring")
+def test_monitor_store_stats_and_endpoint(tmp_path: Any) -> None:
+    """Тест записи результатов, подсчета перцентилей и выдачи их через HTTP."""
+    store = TimeSeriesStore(str(tmp_path / "timeseries.sqlite"))
+    monitor = Monitor(store, [])
+
+    with allure.step("Выполнение успешной и упавшей проверки"):
+        monitor.run_check(FakeWorker(), Check(0, "test_api_key_valid", "api", 60, lambda _: None))
+        monitor.run_check(FakeWorker(), Check(0, "test_api_search_shrek", "api", 60, failing_check))
+
+    with allure.step("Проверка статистики за окно"):
+        stats = store.stats(3600)
+        assert stats["test_api_key_valid"]["runs"] == 1
+        assert stats["test_api_key_valid"]["metrics"]["request_latency"]["p50"] == 0.25
+        assert stats["test_api_search_shrek"]["failures"] == 1
+        assert "500" in store.failures()[0]["error"]
+
+    with allure.step("Получение статистики через HTTP-эндпоинт"):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(store))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            with urlopen(f"http://127.0.0.1:{server.server_port}/stats?window=60") as response:
+                assert json.load(response)["test_api_key_valid"]["runs"] == 1
+        finally:
+            server.shutdown()
+            store.close()
+
+
+@allure.feature("Monitoring")
+@allure.title("Прореживание и удаление устаревших замеров")
+@allure.story("Monitoring")
+def test_monitor_store_downsample(tmp_path: Any) -> None:
+    """Тест сворачивания старых замеров в часовые агрегаты."""
+    store = TimeSeriesStore(str(tmp_path / "timeseries.sqlite"))
+    now = time.time()
+    old = (now // 3600 - 48) * 3600
+
+    for offset, duration in enumerate([1.0, 2.0, 3.0, 4.0]):
+        store.record("test_ui_main_page_load", True, duration, ts=old + offset * 60)
+    store.record("test_ui_main_page_load", True, 5.0, ts=now)
+
+    assert store.downsample(raw_retention=24 * 3600, bucket=3600, now=now) == 1
+
+    rollups = store.rollups("test_ui_main_page_load", "duration")
+    assert rollups == [
+        {"bucket": old, "count": 4, "mean": 2.5, "min": 1.0, "max": 4.0, "p50": 2.0, "p95": 4.0}
+    ]
+    assert store.stats(7 * 24 * 3600, now=now)["test_ui_main_page_load"]["metrics"]["duration"]["count"] == 1
+    store.close()
+
+
+@allure.feature("Monitoring")
+@allure.title("API-проверки мониторинга идут в сеть в обход HTTP-кэша")
+@allure.story("Monitoring")
+def test_monitor_api_worker_bypasses_cache(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Тест, что сессия монитора без кэша и задержка пишется для каждого ответа."""
+    def send(adapter: HTTPAdapter, request: requests.PreparedRequest, **kwargs: Any) -> requests.Response:
+        response = requests.Response()
+        response.status_code = 200
+        response.request = request
+        response._content = b'{"docs": []}'
+        return response
+
+    monkeypatch.setattr(HTTPAdapter, "send", send)
+    worker = ApiWorker()
+    assert not isinstance(worker.session.get_adapter("https://api.kinopoisk.dev"), CachingAdapter)
+
+    def check(session: requests.Session) -> None:
+        for _ in range(2):
+            session.get("https://api.kinopoisk.dev/v1.4/movie", params={"limit": 1})
+
+    samples = worker.run(Check(0, "test_api_key_valid", "api", 60, check))
+    assert [metric for metric, _ in samples] == ["request_latency", "request_latency"]
+    worker.close()
+
+
+@allure.feature("Monitoring")
+@allure.title("Зависшая API-проверка завершается по тайм-ауту и записывается как упавшая")
+@allure.story("Monitoring")
+def test_monitor_api_check_timeout(tmp_path: Any) -> None:
+    """Тест, что запрос к серверу, который не отвечает, прерывается тайм-аутом сессии монитора."""
+    store = TimeSeriesStore(str(tmp_path / "timeseries.sqlite"))
+    worker = ApiWorker(timeout=0.5)
+    # Сервер принимает соединение, но никогда не отвечает
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen()
+    url = f"http://127.0.0.1:{listener.getsockname()[1]}/v1.4/movie"
+
+    def hanging_check(session: requests.Session) -> None:
+        session.get(url)
+
+    try:
+        with allure.step("Выполнение проверки без явного тайм-аута"):
+            started = time.perf_counter()
+            Monitor(store, []).run_check(worker, Check(0, "test_api_key_valid", "api", 60, hanging_check))
+            assert time.perf_counter() - started < 5, "Проверка должна прерываться тайм-аутом сессии"
+
+        with allure.step("Проверка записи упавшей проверки"):
+            assert store.stats(3600)["test_api_key_valid"]["failures"] == 1
+            assert "Timeout" in store.failures()[0]["error"]
+    finally:
+        worker.close()
+        listener.close()
+        store.close()
+
+
+class BrokenBrowser:
+    """Браузер, который упал во время проверки и не отвечает на команды."""
+
+    page_load_timeout = None
+
+    def set_page_load_timeout(self, timeout: float) -> None:
+        self.page_load_timeout = timeout
+
+    @property
+    def current_url(self) -> str:
+        raise ConnectionError("браузер не отвечает")
+
+    def quit(self) -> None:
+        raise ConnectionError("браузер не отвечает")
+
+
+@allure.feature("Monitoring")
+@allure.title("Ошибка UI-проверки не подменяется сбоем закрытия браузера")
+@allure.story("Monitoring")
+def test_monitor_ui_worker_keeps_check_error(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Тест, что UiWorker пробрасывает исходную ошибку проверки и сбрасывает упавший браузер."""
+    import test_ui
+
+    browser = BrokenBrowser()
+    monkeypatch.setattr(test_ui, "create_browser", lambda headless=False: browser)
+    worker = UiWorker(page_load_timeout=30)
+
+    with pytest.raises(AssertionError, match="500"):
+        worker.run(Check(0, "test_ui_main_page_load", "ui", 60, failing_check))
+
+    assert worker.browser is None, "Упавший браузер должен быть пересоздан при следующей проверке"
+    assert browser.page_load_timeout == 30
+
+
+@allure.feature("Monitoring")
+@allure.title("Отклонение неизвестных проверок в расписании мониторинга")
+@allure.story("Monitoring")
+def test_monitor_schedule_rejects_unknown_checks() -> None:
+    """Тест, что опечатка в расписании не проходит молча."""
+    with pytest.raises(ValueError, match="test_api_key_vaild"):
+        discover_checks({"test_api_key_vaild": 60}, include_ui=False)
+
+    checks = discover_checks({"test_api_key_valid": 0, "test_ui_main_page_load": 60}, include_ui=False)
+    assert "test_api_key_valid" not in {check.name for check in checks}
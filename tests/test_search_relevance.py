@@ -0,0 +1,200 @@
+"""Модуль для регрессионной проверки релевантности поиска API Кинопоиска."""
+import json
+import os
+import sys
+from typing import Any, Dict
+
+import allure
+import pytest
+import requests
+
+from search_relevance import (
+    CORPUS_PATH,
+    TitleIndex,
+    format_report,
+    load_corpus,
+    normalize_title,
+    run_queries,
+    score_results,
+)
+
+
+SEARCH_CORPUS = os.getenv('SEARCH_CORPUS', CORPUS_PATH)
+SEARCH_WORKERS = int(os.getenv('SEARCH_WORKERS', '8'))
+SEARCH_LIMIT = int(os.getenv('SEARCH_LIMIT', '10'))
+
+
+def describe_movie(index: TitleIndex, movie: Dict[str, Any]) -> str:
+    """Описывает фильм из выдачи для отчета о промахах."""
+    name = movie.get('name') or movie.get('alternativeName') or ''
+    nearest = index.lookup(name)
+    suffix = f" ~ {index.titles[nearest]['name']} (id {nearest})" if nearest is not None else ""
+    return f"{name} ({movie.get('year', 'N/A')}, id {movie.get('id')}){suffix}"
+
+
+@allure.feature("API Tests")
+@allure.title("Нормализация вариантов написания названий")
+@allure.description("Тест проверяет, что регистр, ё/е, э/е и транслитерация сводятся к одному ключу")
+@allure.story("Search")
+def test_search_normalization() -> None:
+    """Тест нормализации названий без обращения к API."""
+    with allure.step("Сравнение нормализованных вариантов 'Шрек'"):
+        variants = {normalize_title(text) for text in ["Шрек", "ШРЕК", "Шрэк", "Shrek", "shrek"]}
+        assert variants == {"шрек"}, f"Варианты не свелись к одному ключу: {variants}"
+
+    with allure.step("Сравнение вариантов с буквой ё"):
+        assert normalize_title("Зелёная миля") == normalize_title("Зеленая миля")
+        assert normalize_title("Ёлки") == normalize_title("Yolki")
+
+
+@allure.feature("API Tests")
+@allure.title("Продолжения и ремейки не засчитываются как исходный фильм")
+@allure.description("Тест проверяет, что сопоставление с известными названиями идет по id Кинопоиска")
+@allure.story("Search")
+def test_search_resolve_sequels() -> None:
+    """Тест сопоставления выдачи с корпусом без обращения к API."""
+    index = TitleIndex(load_corpus()["titles"])
+
+    with allure.step("Сопоставление по id Кинопоиска"):
+        assert index.resolve({"id": 301, "name": "Матрица"}) == 301
+
+    with allure.step("Продолжение не сопоставляется с исходным фильмом"):
+        assert index.resolve({"name": "Матрица 4"}) is None
+        assert index.resolve({"id": 1234567, "name": "Матрица 4"}) is None
+
+    with allure.step("Ремейк с тем же названием, но другим id, не засчитывается"):
+        assert index.resolve({"id": 1234567, "name": "Король Лев", "enName": "The Lion King"}) is None
+
+    with allure.step("Без id допускается только точное совпадение названия"):
+        assert index.resolve({"name": "The Matrix"}) == 301
+        assert index.resolve({"name": "The Lion King 2019"}) is None
+
+
+@allure.feature("API Tests")
+@allure.title("Ремейки с одинаковым названием и проверка ожидаемых названий корпуса")
+@allure.story("Search")
+def test_search_corpus_validation(tmp_path: Any) -> None:
+    """Тест, что индекс различает фильмы по id, а корпус отклоняет неизвестные и неоднозначные названия."""
+    titles = [{"id": 2360, "name": "Король Лев"}, {"id": 1000, "name": "Король Лев"}]
+
+    with allure.step("Фильмы с одинаковым названием различаются по id"):
+        index = TitleIndex(titles)
+        assert index.resolve({"id": 1000}) == 1000
+        assert index.resolve({"id": 2360}) == 2360
+        assert index.resolve({"name": "Король Лев"}) is None, "Без id одноименные фильмы неразличимы"
+
+    def write_corpus(queries: Any) -> str:
+        path = tmp_path / "corpus.json"
+        path.write_text(json.dumps({"titles": titles, "queries": queries, "expand": False}), encoding="utf-8")
+        return str(path)
+
+    with allure.step("Ожидаемый фильм можно указать по id"):
+        corpus = load_corpus(write_corpus([{"query": "Король Лев", "class": "exact", "expected": [2360]}]))
+        assert corpus["queries"][0]["expected"] == [2360]
+
+    with allure.step("Неоднозначное и неизвестное название отклоняются"):
+        with pytest.raises(ValueError, match="неоднозначно"):
+            load_corpus(write_corpus([{"query": "Король Лев", "class": "exact", "expected": ["Король Лев"]}]))
+        with pytest.raises(ValueError, match="неизвестное"):
+            load_corpus(write_corpus([{"query": "Матрица", "class": "exact", "expected": ["Матрица"]}]))
+        with pytest.raises(ValueError, match="неизвестное"):
+            load_corpus(write_corpus([{"query": "Матрица", "class": "exact", "expected": [301]}]))
+
+
+@allure.feature("API Tests")
+@allure.title("Подсчет recall и MRR по классам запросов")
+@allure.story("Search")
+def test_search_score_results() -> None:
+    """Тест метрик на синтетической выдаче: попадание не на первом месте, ошибка и промах."""
+    index = TitleIndex([
+        {"id": 301, "name": "Матрица"},
+        {"id": 41519, "name": "Брат"},
+        {"id": 41520, "name": "Брат 2"},
+    ])
+    results = [
+        {"query": "Матрица", "class": "exact", "expected": [301], "error": None,
+         "docs": [{"id": 999, "name": "Матрица 4"}, {"id": 301, "name": "Матрица"}]},
+        {"query": "Брат", "class": "exact", "expected": [41519], "error": None,
+         "docs": [{"id": 41519, "name": "Брат"}]},
+        {"query": "Brat", "class": "translit", "expected": [41519], "error": None,
+         "docs": [{"id": 41520, "name": "Брат 2"}]},
+        {"query": "Brat 2", "class": "translit", "expected": [41520], "error": "503 Server Error", "docs": []},
+        {"query": "Брат", "class": "multi", "expected": [41519, 41520], "error": None,
+         "docs": [{"id": 1, "name": "Сестры"}, {"id": 41520}, {"id": 2}, {"id": 41519}]},
+    ]
+
+    report = score_results(index, results)
+
+    assert report == {
+        "exact": {"queries": 2, "errors": 0, "recall": 1.0, "mrr": 0.75},
+        "translit": {"queries": 2, "errors": 1, "recall": 0.0, "mrr": 0.0},
+        "multi": {"queries": 1, "errors": 0, "recall": 1.0, "mrr": 0.5},
+    }
+    assert format_report(report).splitlines() == [
+        "class         queries  errors  recall     mrr",
+        "exact               2       0   1.000   0.750",
+        "multi               1       0   1.000   0.500",
+        "translit            2       1   0.000   0.000",
+    ]
+
+
+@allure.feature("API Tests")
+@allure.title("Регрессия релевантности поиска по корпусу запросов")
+@allure.description("Тест выполняет корпус запросов и считает recall и MRR по классам запросов")
+@allure.story("Search")
+@pytest.mark.api
+@pytest.mark.regression
+def test_api_search_relevance(api_client: requests.Session, request: pytest.FixtureRequest) -> None:
+    """Тест релевантности поиска по корпусу запросов."""
+    # Корпус отправляет сотни запросов и расходует квоту ключа, поэтому запускается только явно
+    if not os.getenv('SEARCH_CORPUS') and "regression" not in request.config.getoption("markexpr"):
+        pytest.skip("Запустите с -m regression или задайте SEARCH_CORPUS")
+
+    with allure.step("Загрузка корпуса и построение индекса названий"):
+        corpus = load_corpus(SEARCH_CORPUS)
+        index = TitleIndex(corpus["titles"])
+        print(f"\n📚 Загружено {len(corpus['titles'])} названий и {len(corpus['queries'])} запросов")
+
+    with allure.step(f"Выполнение запросов в {SEARCH_WORKERS} потоков"):
+        results = run_queries(api_client, corpus["queries"], limit=SEARCH_LIMIT, workers=SEARCH_WORKERS)
+
+    with allure.step("Подсчет recall и MRR по классам запросов"):
+        report = score_results(index, results)
+        table = format_report(report)
+        print(table)
+        allure.attach(
+            table,
+            name="Search relevance",
+            attachment_type=allure.attachment_type.TEXT
+        )
+
+    # Рядом с каждым результатом — ближайшее известное название: так видно, что в выдаче продолжение или ремейк
+    misses = [
+        f"[{result['class']}] {result['query']} -> "
+        f"{[describe_movie(index, movie) for movie in result['docs'][:3]] or result['error']}"
+        for result in results
+        if not any(index.resolve(movie) in result["expected"] for movie in result["docs"])
+    ]
+    if misses:
+        allure.attach(
+            "\n".join(misses),
+            name="Missed queries",
+            attachment_type=allure.attachment_type.TEXT
+        )
+
+    thresholds = corpus["thresholds"]
+    for query_class, stats in report.items():
+        with allure.step(f"Проверка метрик класса '{query_class}'"):
+            assert stats["errors"] < stats["queries"], f"Все запросы класса '{query_class}' завершились ошибкой"
+            assert stats["recall"] >= thresholds.get("recall", 0.0), (
+                f"Recall класса '{query_class}' {stats['recall']:.3f} ниже порога"
+            )
+            assert stats["mrr"] >= thresholds.get("mrr", 0.0), (
+                f"MRR класса '{query_class}' {stats['mrr']:.3f} ниже порога"
+            )
+
+    print(f"✅ Проверено {len(results)} запросов, промахов: {len(misses)}")
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main(['-v', '-s', '--tb=short', '--alluredir=allure-results', __file__]))
@@ -20,10 +20,11 @@ from selenium.webdriver.support.ui import WebDriverWait
 load_dotenv()
 
 
-@pytest.fixture(scope='function')
-def browser() -> Generator[WebDriver, Any, None]:
-    """Фикстура для инициализации браузера."""
+def create_browser(headless: bool = False) -> WebDriver:
+    """Создает и настраивает экземпляр Chrome."""
     chrome_options = Options()
+    if headless:
+        chrome_options.add_argument('--headless=new')
     chrome_options.add_argument('--no-sandbox')
     chrome_options.add_argument('--disable-dev-shm-usage')
     chrome_options.add_argument('--disable-gpu')
@@ -37,6 +38,13 @@ def browser() -> Generator[WebDriver, Any, None]:
         "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"
     )
     driver.implicitly_wait(10)
+    return driver
+
+
+@pytest.fixture(scope='function')
+def browser() -> Generator[WebDriver, Any, None]:
+    """Фикстура для инициализации браузера."""
+    driver = create_browser()
 
     yield driver
 